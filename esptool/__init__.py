@@ -859,14 +859,22 @@ def read_flash_cli(ctx, address, size, output, **kwargs):
 @cli.command("verify-flash")
 @click.argument("addr-filename", nargs=-1, required=True, cls=AddrFilenameArg)
 @click.option("--diff", "-d", is_flag=True, help="Show differences.")
+@click.option(
+    "--diff-limit",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Stop showing differences after this many (default: show all).",
+)
 @add_spi_flash_options(allow_keep=True, auto_detect=True)
 @add_spi_connection_arg
 @click.pass_context
-def verify_flash_cli(ctx, addr_filename, diff, **kwargs):
+def verify_flash_cli(ctx, addr_filename, diff, diff_limit, **kwargs):
     """Verify a binary blob against the flash memory content."""
     prepare_esp_object(ctx)
     attach_flash(ctx.obj["esp"], kwargs.pop("spi_connection", None))
-    verify_flash(ctx.obj["esp"], addr_filename, diff=diff, **kwargs)
+    verify_flash(
+        ctx.obj["esp"], addr_filename, diff=diff, diff_limit=diff_limit, **kwargs
+    )
 
 
 @cli.command("erase-flash")
@@ -13,8 +13,6 @@ import struct
 import tempfile
 from typing import IO
 
-from intelhex import HexRecordError, IntelHex
-
 from .loader import ESPLoader
 from .logger import log
 from .targets import (
@@ -47,16 +45,18 @@ def intel_hex_to_bin(file: IO[bytes], start_addr: int | None = None) -> IO[bytes
     INTEL_HEX_MAGIC = b":"
     magic = file.read(1)
     file.seek(0)
+    if magic != INTEL_HEX_MAGIC:
+        return file
+    # Imported here, most inputs are binary files and don't need intelhex
+    from intelhex import HexRecordError, IntelHex
+
     try:
-        if magic == INTEL_HEX_MAGIC:
-            ih = IntelHex()
-            ih.loadhex(file.name)
-            file.close()
-            bin = tempfile.NamedTemporaryFile(suffix=".bin", delete=False)
-            ih.tobinfile(bin, start=start_addr)
-            return bin
-        else:
-            return file
+        ih = IntelHex()
+        ih.loadhex(file.name)
+        file.close()
+        bin = tempfile.NamedTemporaryFile(suffix=".bin", delete=False)
+        ih.tobinfile(bin, start=start_addr)
+        return bin
     except (HexRecordError, UnicodeDecodeError):
         # file started with HEX magic but the rest was not according to the standard
         return file
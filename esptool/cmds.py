@@ -3,16 +3,17 @@
 #
 # SPDX-License-Identifier: GPL-2.0-or-later
 
+import bisect
 import hashlib
+import heapq
 import io
 import os
 import struct
 import sys
 import time
 import zlib
-import itertools
 
-from intelhex import IntelHex
+from concurrent.futures import ThreadPoolExecutor
 from serial import SerialException
 from typing import cast
 
@@ -27,7 +28,6 @@ from .loader import (
     DEFAULT_TIMEOUT,
     ERASE_WRITE_TIMEOUT_PER_MB,
     ESPLoader,
-    timeout_per_mb,
 )
 from .logger import log
 
@@ -76,6 +76,12 @@ DETECTED_FLASH_SIZES = {
     0x3A: "64MB",
 }
 
+# Flash size for every possible 8-bit size ID (None if not recognized),
+# indexed directly instead of hashing the ID for a dict lookup
+_DETECTED_FLASH_SIZES_TABLE: tuple[str | None, ...] = tuple(
+    DETECTED_FLASH_SIZES.get(i) for i in range(256)
+)
+
 FLASH_MODES = {
     "qio": 0,
     "qout": 1,
@@ -83,6 +89,40 @@ FLASH_MODES = {
     "dout": 3,
 }
 
+# Uncompressed bytes between the flush points of a compressed flash write.
+# Flushing more often costs compression ratio, less often makes the per-block
+# write size estimate coarser.
+_COMPRESS_SYNC_INTERVAL = 0x4000
+
+# The following mapping was taken from the ROM code
+# This mapping is same across all targets in the ROM
+SECURITY_INFO_FLAG_MAP = {
+    "SECURE_BOOT_EN": (1 << 0),
+    "SECURE_BOOT_AGGRESSIVE_REVOKE": (1 << 1),
+    "SECURE_DOWNLOAD_ENABLE": (1 << 2),
+    "SECURE_BOOT_KEY_REVOKE0": (1 << 3),
+    "SECURE_BOOT_KEY_REVOKE1": (1 << 4),
+    "SECURE_BOOT_KEY_REVOKE2": (1 << 5),
+    "SOFT_DIS_JTAG": (1 << 6),
+    "HARD_DIS_JTAG": (1 << 7),
+    "DIS_USB": (1 << 8),
+    "DIS_DOWNLOAD_DCACHE": (1 << 9),
+    "DIS_DOWNLOAD_ICACHE": (1 << 10),
+}
+
+# Memory type and capacity IDs of the XMC flash chips
+# that are recognized as having booted up correctly
+_XMC_CHIP_IDS = frozenset(
+    [(0x40, cpid) for cpid in range(0x13, 0x21)]
+    + [(0x41, cpid) for cpid in range(0x17, 0x21)]
+    + [(0x50, cpid) for cpid in range(0x15, 0x17)]
+)
+
+# First 4 bytes of an image header: magic, segment count, flash mode, flash size/freq
+_IMAGE_HEADER_START = struct.Struct("BBBB")
+# Flash mode and flash size/freq bytes of an image header
+_IMAGE_FLASH_PARAMS = struct.Struct("BB")
+
 
 def detect_chip(
     port: str = ESPLoader.DEFAULT_PORT,
@@ -210,6 +250,7 @@ def load_ram(esp: ESPLoader, input: ImageSource) -> None:
     log.stage()
     source = "image" if source is None else f"'{source}'"
     log.print(f"Loading {source} to RAM...")
+    ram_block = esp.ESP_RAM_BLOCK
     for i, seg in enumerate(image.segments, start=1):
         size = len(seg.data)
         log.progress_bar(
@@ -219,14 +260,11 @@ def load_ram(esp: ESPLoader, input: ImageSource) -> None:
             suffix="...",
         )
 
-        esp.mem_begin(
-            size, div_roundup(size, esp.ESP_RAM_BLOCK), esp.ESP_RAM_BLOCK, seg.addr
-        )
-        seq = 0
-        while len(seg.data) > 0:
-            esp.mem_block(seg.data[0 : esp.ESP_RAM_BLOCK], seq)
-            seg.data = seg.data[esp.ESP_RAM_BLOCK :]
-            seq += 1
+        esp.mem_begin(size, div_roundup(size, ram_block), ram_block, seg.addr)
+        # Send zero-copy views of the segment instead of re-slicing the remaining data
+        seg_data = memoryview(seg.data)
+        for seq, offset in enumerate(range(0, size, ram_block)):
+            esp.mem_block(seg_data[offset : offset + ram_block], seq)
     log.stage(finish=True)
     log.print(
         f"Loaded {len(image.segments)} segments from {source} to RAM, "
@@ -276,41 +314,45 @@ def dump_mem(
         Memory dump as bytes if output is None;
         otherwise, returns None after writing to file.
     """
-    data = io.BytesIO()  # Use BytesIO to store the memory dump
+    # There is no bulk memory read command, so the memory is read one word at a time
+    # into a buffer preallocated for the whole dump
+    word_count = size // 4
+    data = bytearray(word_count * 4)
     log.stage()
     log.print(
         f"Dumping {size} bytes from {address:#010x}"
         + (f" to file '{output}'..." if output else "...")
     )
     t = time.time()
+    read_reg = esp.read_reg
+    pack_word_into = struct.Struct("<I").pack_into
     # Read the memory in 4-byte chunks.
-    for i in range(size // 4):
+    for i in range(word_count):
         cur_addr = address + (i * 4)
-        d = esp.read_reg(cur_addr)
-        data.write(struct.pack("<I", d))  # Write 4 bytes to BytesIO
-        # Update progress every 1024 bytes.
-        cur = data.tell()
-        if cur % 1024 == 0 or cur == size:
+        pack_word_into(data, i * 4, read_reg(cur_addr))
+        # Update progress every 256 words (1024 bytes) and after the last one.
+        if i & 0xFF == 0xFF or i == word_count - 1:
+            cur = (i + 1) * 4
             log.progress_bar(
-                cur_iter=data.tell(),
-                total_iters=size,
+                cur_iter=cur,
+                total_iters=len(data),
                 prefix=f"Dumping from {cur_addr:#010x} ",
-                suffix=f" {cur}/{size} bytes...",
+                suffix=f" {cur}/{len(data)} bytes...",
             )
     t = time.time() - t
-    speed_msg = " ({:.1f} kbit/s)".format(data.tell() / t * 8 / 1000) if t > 0.0 else ""
+    speed_msg = " ({:.1f} kbit/s)".format(len(data) / t * 8 / 1000) if t > 0.0 else ""
     dest_msg = f" to '{output}'" if output else ""
     log.stage(finish=True)
     log.print(
-        f"Dumped {data.tell()} bytes from {address:#010x} in {t:.1f} seconds"
+        f"Dumped {len(data)} bytes from {address:#010x} in {t:.1f} seconds"
         f"{speed_msg}{dest_msg}."
     )
     if output:
         with open(output, "wb") as f:
-            f.write(data.getvalue())
+            f.write(data)
         return None
     else:
-        return data.getvalue()
+        return bytes(data)
 
 
 def detect_flash_size(esp: ESPLoader) -> str | None:
@@ -329,11 +371,65 @@ def detect_flash_size(esp: ESPLoader) -> str | None:
             "Need to manually specify flash size."
         )
     flash_id = esp.flash_id()
-    size_id = flash_id >> 16
-    flash_size = DETECTED_FLASH_SIZES.get(size_id)
+    size_id: int = (flash_id >> 16) & 0xFF
+    flash_size = _DETECTED_FLASH_SIZES_TABLE[size_id]
     return flash_size
 
 
+def _erased_md5(size):
+    """
+    MD5 digest of an erased flash region of the given size (all bytes 0xFF),
+    hashed in fixed-size chunks instead of allocating the whole region.
+    """
+    chunk_size = 0x10000
+    erased_chunk = b"\xff" * chunk_size
+    md5 = hashlib.md5()
+    for _ in range(size // chunk_size):
+        md5.update(erased_chunk)
+    md5.update(erased_chunk[: size % chunk_size])
+    return md5.hexdigest()
+
+
+def _compress_image(image, sync_interval, md5=None):
+    """
+    Compress an image for a compressed flash write, flushing the compressor
+    to a byte boundary after every ``sync_interval`` bytes of input.
+
+    Args:
+        image (bytes): The uncompressed image data.
+        sync_interval (int): Number of uncompressed bytes between flush points.
+        md5 (hashlib._Hash, optional): Hash object updated with the uncompressed
+            data in the same pass.
+
+    Returns:
+        tuple[bytes, list[int], list[int]]: The compressed image, and the compressed
+            and uncompressed offsets of every flush point. Compressed data up to
+            a flush point decompresses to exactly the data up to its uncompressed
+            offset, which tells how much will be written without decompressing.
+    """
+    compressor = zlib.compressobj(9)
+    image_view = memoryview(image)
+    chunks = []
+    sync_comp_offsets = []
+    sync_uncomp_offsets = []
+    comp_offset = 0
+    for offset in range(0, len(image), sync_interval):
+        uncomp_chunk = image_view[offset : offset + sync_interval]
+        if md5 is not None:
+            md5.update(uncomp_chunk)
+        chunk = compressor.compress(uncomp_chunk)
+        chunk += compressor.flush(zlib.Z_SYNC_FLUSH)
+        chunks.append(chunk)
+        comp_offset += len(chunk)
+        sync_comp_offsets.append(comp_offset)
+        sync_uncomp_offsets.append(min(offset + sync_interval, len(image)))
+    chunk = compressor.flush()
+    chunks.append(chunk)
+    sync_comp_offsets.append(comp_offset + len(chunk))
+    sync_uncomp_offsets.append(len(image))
+    return b"".join(chunks), sync_comp_offsets, sync_uncomp_offsets
+
+
 def _update_image_flash_params(esp, address, flash_freq, flash_mode, flash_size, image):
     """
     Update the flash mode, size, and freq parameters in a bootloader image,
@@ -364,8 +460,13 @@ def _update_image_flash_params(esp, address, flash_freq, flash_mode, flash_size,
     if (flash_mode, flash_freq, flash_size) == ("keep",) * 3:
         return image  # all settings are 'keep', not modifying anything
 
+    # read the header fields through a view, slicing it doesn't copy the image
+    image_view = memoryview(image)
+
     # unpack the (potential) image header
-    magic, _, img_flash_mode, img_flash_size_freq = struct.unpack("BBBB", image[:4])
+    magic, _, img_flash_mode, img_flash_size_freq = _IMAGE_HEADER_START.unpack_from(
+        image_view
+    )
 
     # easy check if this is an image: does it start with a magic byte?
     if magic != esp.ESP_IMAGE_MAGIC:
@@ -379,8 +480,8 @@ def _update_image_flash_params(esp, address, flash_freq, flash_mode, flash_size,
     # starts with esp.ESP_IMAGE_MAGIC (mostly a problem for encrypted
     # images that happen to start with a magic byte
     try:
-        test_image = esp.BOOTLOADER_IMAGE(io.BytesIO(image))
-        test_image.verify()
+        image_object = esp.BOOTLOADER_IMAGE(io.BytesIO(image))
+        image_object.verify()
     except Exception:
         log.warning(
             f"Image file at {address:#x} is not a valid {esp.CHIP_NAME} image,"
@@ -391,7 +492,7 @@ def _update_image_flash_params(esp, address, flash_freq, flash_mode, flash_size,
     # After the 8-byte header comes the extended header for chips others than ESP8266.
     # The 15th byte of the extended header indicates if the image is protected by SHA256
     # checksum. In that case we recalculate the SHA digest after modifying the header.
-    sha_appended = esp.CHIP_NAME != "esp8266" and image[8 + 15] == 1
+    sha_appended = esp.CHIP_NAME != "esp8266" and image_view[8 + 15] == 1
 
     if flash_mode != "keep":
         img_flash_mode = FLASH_MODES[flash_mode]
@@ -404,40 +505,45 @@ def _update_image_flash_params(esp, address, flash_freq, flash_mode, flash_size,
     if flash_size != "keep":
         img_flash_size = esp.parse_flash_size_arg(flash_size)
 
-    flash_params = struct.pack(b"BB", img_flash_mode, img_flash_size + img_flash_freq)
-    if flash_params != image[2:4]:
+    flash_params = _IMAGE_FLASH_PARAMS.pack(
+        img_flash_mode, img_flash_size + img_flash_freq
+    )
+    if flash_params != image_view[2:4]:
         log.print(
-            f"Flash parameters set to {struct.unpack('>H', flash_params)[0]:#06x}."
+            f"Flash parameters set to {int.from_bytes(flash_params, 'big'):#06x}."
         )
-        image = image[0:2] + flash_params + image[4:]
+        image = b"".join((image_view[:2], flash_params, image_view[4:]))
 
     # recalculate the SHA digest if it was appended
     if sha_appended:
         # Since the changes are only made for images located in the bootloader offset,
         # we can assume that the image is always a bootloader image.
         # For merged binaries, we check the bootloader SHA when parameters are changed.
-        image_object = esp.BOOTLOADER_IMAGE(io.BytesIO(image))
+        # Changing the flash parameters doesn't move anything in the image, so reuse
+        # the layout of the image parsed above instead of parsing it again.
+        sha_start = image_object.data_length
+        sha_end = sha_start + image_object.SHA256_DIGEST_LEN
+        image_view = memoryview(image)
         # get the image header, extended header (if present) and data
-        image_data_before_sha = image[: image_object.data_length]
+        image_data_before_sha = image_view[:sha_start]
         # get the image data after the SHA digest (primary for merged binaries)
-        image_data_after_sha = image[
-            (image_object.data_length + image_object.SHA256_DIGEST_LEN) :
-        ]
+        image_data_after_sha = image_view[sha_end:]
 
-        sha_digest_calculated = hashlib.sha256(image_data_before_sha).digest()
-        image = bytes(
-            itertools.chain(
-                image_data_before_sha, sha_digest_calculated, image_data_after_sha
-            )
+        # hash the original buffer in place, without copying the hashed region first
+        sha = hashlib.sha256()
+        sha.update(image_data_before_sha)
+        sha_digest_calculated = sha.digest()
+
+        # splice the new digest in with a single copy of the (possibly multi-MB
+        # merged) image, the views are only materialized by the join
+        image = b"".join(
+            (image_data_before_sha, sha_digest_calculated, image_data_after_sha)
         )
 
         # get SHA digest newly stored in the image and compare it to the calculated one
-        image_stored_sha = image[
-            image_object.data_length : image_object.data_length
-            + image_object.SHA256_DIGEST_LEN
-        ]
+        image_stored_sha = image[sha_start:sha_end]
 
-        if hexify(sha_digest_calculated) == hexify(image_stored_sha):
+        if sha_digest_calculated == image_stored_sha:
             log.print("SHA digest in image updated.")
         else:
             log.warning(
@@ -498,15 +604,30 @@ def write_flash(
     ignore_flash_enc_efuse: bool = kwargs.get("ignore_flash_enc_efuse", False)
     no_progress: bool = kwargs.get("no_progress", False)
 
+    # Read the files to encrypt only once, they are needed by both the sanity checks
+    # and the actual flashing
+    norm_encrypt_files = (
+        None
+        if encrypt_files is None
+        else [(addr, get_bytes(data)) for addr, data in encrypt_files]
+    )
+
+    sector_size = esp.FLASH_SECTOR_SIZE
+    encrypted_write_align = esp.FLASH_ENCRYPTED_WRITE_ALIGN
+
     # set compress based on default behaviour:
     # -> if either "compress" or "no_compress" is set, honour that
     # -> otherwise, set "compress" unless the stub flasher is disabled
     if not compress and not no_compress:
         compress = esp.IS_STUB
 
+    # The secure boot state can't change during the write, so read it at most once
+    secure_boot_enabled: bool | None = None
+
     if not force and esp.CHIP_NAME != "ESP8266" and not esp.secure_download_mode:
         # Check if secure boot is active
-        if esp.get_secure_boot_enabled():
+        secure_boot_enabled = esp.get_secure_boot_enabled()
+        if secure_boot_enabled:
             for address, _ in norm_addr_data:
                 if address < 0x8000:
                     raise FatalError(
@@ -600,23 +721,21 @@ def write_flash(
                 log.print("Flash encryption key is not programmed.")
                 do_write = False
 
-        # Determine which files list contain the ones to encrypt
-        files_to_encrypt = (
-            norm_addr_data
-            if encrypt is not None
-            else [(addr, get_bytes(data)) for addr, data in encrypt_files]
+        # Collect the files to encrypt, with --encrypt these are all the input files,
+        # the encrypt_files are always written encrypted
+        files_to_encrypt = (norm_addr_data if encrypt else []) + (
+            norm_encrypt_files or []
         )
 
-        if files_to_encrypt is not None:
-            for address, (data, name) in files_to_encrypt:
-                if address % esp.FLASH_ENCRYPTED_WRITE_ALIGN:
-                    source = "Input image" if name is None else f"'{name}'"
-                    log.warning(
-                        f"{source} (address {address:#x}) is not "
-                        f"{esp.FLASH_ENCRYPTED_WRITE_ALIGN} byte aligned, "
-                        "can't flash encrypted."
-                    )
-                    do_write = False
+        for address, (data, name) in files_to_encrypt:
+            if address % encrypted_write_align:
+                source = "Input image" if name is None else f"'{name}'"
+                log.warning(
+                    f"{source} (address {address:#x}) is not "
+                    f"{encrypted_write_align} byte aligned, "
+                    "can't flash encrypted."
+                )
+                do_write = False
 
         if not do_write and not ignore_flash_enc_efuse:
             raise FatalError(
@@ -629,7 +748,7 @@ def write_flash(
             if (
                 esp.CHIP_NAME != "ESP32"
                 and esp.secure_download_mode
-                and bin(esp.get_security_info()["flash_crypt_cnt"]).count("1") & 1 != 0
+                and esp.get_security_info()["flash_crypt_cnt"].bit_count() & 1 != 0
             ):
                 raise FatalError(
                     "WARNING: Detected flash encryption and "
@@ -683,20 +802,18 @@ def write_flash(
     else:
         for address, (data, _) in norm_addr_data:
             write_end = address + len(data)
-            bytes_over = address % esp.FLASH_SECTOR_SIZE
+            bytes_over = address % sector_size
             if bytes_over != 0:
                 log.note(
                     f"Flash address {address:#010x} is not aligned "
-                    f"to a {esp.FLASH_SECTOR_SIZE:#x} byte flash sector. "
+                    f"to a {sector_size:#x} byte flash sector. "
                     f"{bytes_over:#x} bytes before this address will be erased."
                 )
             # Print the address range of to-be-erased flash memory region
             log.print(
                 "Flash will be erased from {:#010x} to {:#010x}...".format(
                     address - bytes_over,
-                    div_roundup(write_end, esp.FLASH_SECTOR_SIZE)
-                    * esp.FLASH_SECTOR_SIZE
-                    - 1,
+                    div_roundup(write_end, sector_size) * sector_size - 1,
                 )
             )
 
@@ -719,16 +836,26 @@ def write_flash(
     Now do the same with encrypt_files list, if defined.
     In this case, the flag is True
     """
-    if encrypt_files is not None:
+    if norm_encrypt_files is not None:
         encrypted_files_flag = [
-            (addr, *get_bytes(data), True) for (addr, data) in encrypt_files
+            (addr, data, name, True) for (addr, (data, name)) in norm_encrypt_files
         ]
 
-        # Concatenate both lists and sort them.
-        # As both list are already sorted, we could simply do a merge instead,
-        # but for the sake of simplicity and because the lists are very small,
-        # let's use sorted.
-        all_files = sorted(all_files + encrypted_files_flag, key=lambda x: x[0])
+        # Both lists are already sorted by address, so merge them
+        # instead of concatenating and sorting again.
+        all_files = list(
+            heapq.merge(all_files, encrypted_files_flag, key=lambda x: x[0])
+        )
+
+    # With all flash settings kept, no image header gets modified,
+    # so there is no need to read the secure boot state for every file
+    keep_flash_params = (flash_mode, flash_freq, flash_size) == ("keep",) * 3
+    if (
+        secure_boot_enabled is None
+        and not keep_flash_params
+        and not esp.secure_download_mode
+    ):
+        secure_boot_enabled = esp.get_secure_boot_enabled()
 
     for address, data, name, encrypted in all_files:
         compress = compress
@@ -749,7 +876,7 @@ def write_flash(
             )
             continue
 
-        image = pad_to(image, esp.FLASH_ENCRYPTED_WRITE_ALIGN if encrypted else 4)
+        image = pad_to(image, encrypted_write_align if encrypted else 4)
 
         if not esp.IS_STUB:
             log.print("Erasing flash...")
@@ -757,83 +884,119 @@ def write_flash(
             # It is not possible to write to not aligned addresses without stub,
             # so there are added 0xFF (erase) bytes at the beginning of the image
             # to align it.
-            bytes_over = address % esp.FLASH_SECTOR_SIZE
+            bytes_over = address % sector_size
             address -= bytes_over
             image = b"\xff" * bytes_over + image
 
-        if not esp.secure_download_mode and not esp.get_secure_boot_enabled():
-            image = _update_image_flash_params(
-                esp, address, flash_freq, flash_mode, flash_size, image
-            )
-        else:
+        if esp.secure_download_mode or (not keep_flash_params and secure_boot_enabled):
             log.warning(
                 "Security features enabled, so not changing any flash settings."
             )
-        calcmd5 = hashlib.md5(image).hexdigest()
+        elif not keep_flash_params:
+            image = _update_image_flash_params(
+                esp, address, flash_freq, flash_mode, flash_size, image
+            )
+        # The MD5 is only needed to verify the written data,
+        # which is not possible for encrypted writes or in secure download mode
+        verify = not encrypted and not esp.secure_download_mode
+        md5 = hashlib.md5() if verify else None
         uncsize = len(image)
         if compress:
-            uncimage = image
-            image = zlib.compress(uncimage, 9)
+            # FLASH_DEFL_BEGIN needs the compressed size, so the whole image has to be
+            # compressed up front. A retry resends the same compressed image.
+            image, sync_comp_offsets, sync_uncomp_offsets = _compress_image(
+                image, _COMPRESS_SYNC_INTERVAL, md5
+            )
             compsize = len(image)
-        original_image = image  # Save the whole image in case retry is needed
+        elif md5 is not None:
+            md5.update(image)
+        calcmd5 = md5.hexdigest() if md5 is not None else None
+        # Blocks are sent as views of the image, so a retry can start over from
+        # its beginning without the image being copied
+        image_view = memoryview(image)
+        # Same scaling as timeout_per_mb(), without a function call per block
+        timeout_per_byte = ERASE_WRITE_TIMEOUT_PER_MB / 1e6
         # Try again if reconnect was successful
         log.stage()
         for attempt in range(1, esp.WRITE_FLASH_ATTEMPTS + 1):
             try:
                 if compress:
-                    # Decompress the compressed binary a block at a time,
-                    # to dynamically calculate the timeout based on the real write size
-                    decompress = zlib.decompressobj()
                     esp.flash_defl_begin(uncsize, compsize, address)
                 else:
                     esp.flash_begin(uncsize, address, begin_rom_encrypted=encrypted)
                 seq = 0
+                pos = 0  # position in the image
                 bytes_sent = 0  # bytes sent on wire
                 bytes_written = 0  # bytes written to flash
                 t = time.time()
 
                 timeout = DEFAULT_TIMEOUT
                 image_size = compsize if compress else uncsize
-                while len(image) >= 0:
-                    if not no_progress:
+                # Look these up once per attempt, not per block.
+                # Reconnecting may replace esp with a new stub loader.
+                write_size = esp.FLASH_WRITE_SIZE
+                is_stub = esp.IS_STUB
+                flash_defl_block = esp.flash_defl_block
+                flash_encrypt_block = esp.flash_encrypt_block
+                flash_block = esp.flash_block
+                last_percent = -1
+                while True:
+                    # Redraw only when the whole percentage changes, not for every block
+                    percent = 100 * pos // image_size
+                    if not no_progress and percent != last_percent:
+                        last_percent = percent
                         log.progress_bar(
-                            cur_iter=image_size - len(image),
+                            cur_iter=pos,
                             total_iters=image_size,
                             prefix=f"Writing at {address + bytes_written:#010x} ",
                             suffix=f" {bytes_sent}/{image_size} bytes...",
                         )
-                    if len(image) == 0:  # All data sent, print 100% progress and end
+                    if pos == image_size:  # All data sent, print 100% progress and end
                         break
-                    block = image[0 : esp.FLASH_WRITE_SIZE]
+                    block = image_view[pos : pos + write_size]
+                    pos += len(block)
                     if compress:
-                        # feeding each compressed block into the decompressor lets us
-                        # see block-by-block how much will be written
-                        block_uncompressed = len(decompress.decompress(block))
+                        # The first flush point at or after the end of the block
+                        # bounds how much the data sent so far decompresses to,
+                        # which dynamically calculates the timeout based on the
+                        # real write size. The running total is never too low, but
+                        # a block that ends before a flush point already counted
+                        # gets no credit even though it may write up to
+                        # _COMPRESS_SYNC_INTERVAL (16 KiB) bytes, only the
+                        # DEFAULT_TIMEOUT floor covers it.
+                        sync_index = bisect.bisect_left(
+                            sync_comp_offsets, bytes_sent + len(block)
+                        )
+                        block_uncompressed = (
+                            sync_uncomp_offsets[sync_index] - bytes_written
+                        )
                         bytes_written += block_uncompressed
                         block_timeout = max(
-                            DEFAULT_TIMEOUT,
-                            timeout_per_mb(
-                                ERASE_WRITE_TIMEOUT_PER_MB, block_uncompressed
-                            ),
+                            DEFAULT_TIMEOUT, timeout_per_byte * block_uncompressed
                         )
-                        if not esp.IS_STUB:
+                        if not is_stub:
                             # ROM code writes block to flash before ACKing
                             timeout = block_timeout
-                        esp.flash_defl_block(block, seq, timeout=timeout)
-                        if esp.IS_STUB:
+                        flash_defl_block(block, seq, timeout=timeout)
+                        if is_stub:
                             # Stub ACKs when block is received,
-                            # then writes to flash while receiving the block after it
+                            # then writes to flash while receiving the block after it.
+                            # This already keeps one block in flight; sending more
+                            # before the ACK could overrun the stub's receive buffer
+                            # and would break the per-block error reporting.
                             timeout = block_timeout
                     else:
-                        # Pad the last block
-                        block = block + b"\xff" * (esp.FLASH_WRITE_SIZE - len(block))
+                        if len(block) < write_size:
+                            # Pad the last block
+                            padded_block = bytearray(b"\xff") * write_size
+                            padded_block[: len(block)] = block
+                            block = memoryview(padded_block)
                         if encrypted:
-                            esp.flash_encrypt_block(block, seq)
+                            flash_encrypt_block(block, seq)
                         else:
-                            esp.flash_block(block, seq)
+                            flash_block(block, seq)
                         bytes_written += len(block)
                     bytes_sent += len(block)
-                    image = image[esp.FLASH_WRITE_SIZE :]
                     seq += 1
                 break
             except SerialException:
@@ -855,7 +1018,6 @@ def write_flash(
                             esp.IS_STUB = False
                             # Reflash stub because chip was reset
                             esp = esp.run_stub()
-                        image = original_image
                         break
                     except SerialException:
                         log.print(".", end="", flush=True)
@@ -886,13 +1048,15 @@ def write_flash(
                 f"seconds{speed_msg}."
             )
 
-        if not encrypted and not esp.secure_download_mode:
+        if verify:
+            # The per-packet checksums only cover the serial transfer, not what
+            # ended up in flash, so the readback MD5 can't be skipped
             try:
                 res = esp.flash_md5sum(address, uncsize)
                 if res != calcmd5:
                     log.print(f"Input MD5: {calcmd5}")
                     log.print(f"Flash MD5: {res}")
-                    if res == hashlib.md5(b"\xff" * uncsize).hexdigest():
+                    if res == _erased_md5(uncsize):
                         raise FatalError(
                             "Write failed, the written flash region is empty."
                         )
@@ -932,7 +1096,7 @@ def read_mac(esp: ESPLoader) -> None:
     """
 
     def print_mac(label, mac):
-        log.print(f"{label + ':':<20}{':'.join(f'{x:02x}' for x in mac)}")
+        log.print(f"{label + ':':<20}{bytes(mac).hex(':')}")
 
     eui64 = esp.read_mac("EUI64")
     if eui64:
@@ -1028,20 +1192,7 @@ def attach_flash(
         mfid = (rdid >> 8) & 0xFF
         cpid = rdid & 0xFF
 
-        if vendor_id != XMC_VENDOR_ID:
-            return False
-
-        matched = False
-        if mfid == 0x40:
-            if cpid >= 0x13 and cpid <= 0x20:
-                matched = True
-        elif mfid == 0x41:
-            if cpid >= 0x17 and cpid <= 0x20:
-                matched = True
-        elif mfid == 0x50:
-            if cpid >= 0x15 and cpid <= 0x16:
-                matched = True
-        return matched
+        return vendor_id == XMC_VENDOR_ID and (mfid, cpid) in _XMC_CHIP_IDS
 
     def flash_xmc_startup():
         # If the RDID value is a valid XMC one, may skip the flow
@@ -1248,7 +1399,7 @@ def print_flash_id(esp: ESPLoader) -> None:
     flid_lowbyte = (flash_id >> 16) & 0xFF
     log.print(f"Device: {(flash_id >> 8) & 0xFF:02x}{flid_lowbyte:02x}")
     log.print(
-        f"Detected flash size: {DETECTED_FLASH_SIZES.get(flid_lowbyte, 'Unknown')}"
+        f"Detected flash size: {_DETECTED_FLASH_SIZES_TABLE[flid_lowbyte] or 'Unknown'}"
     )
 
 
@@ -1289,11 +1440,12 @@ def read_flash_sfdp(esp: ESPLoader, address: int, bytes: int = 1) -> None:
         raise FatalError("Invalid number of bytes to read from SFDP (1-4).")
     print_flash_id(esp)
     sfdp = esp.read_spiflash_sfdp(address, bytes * 8)
-    log.print(f"Flash memory SFDP[{address}..{address + bytes - 1}]: ", end="")
-    for _ in range(bytes):
-        log.print(f"{sfdp & 0xFF:#04x} ", end="")
-        sfdp = sfdp >> 8
-    log.print()
+    # The SPI data register is 32 bits wide, only its lowest bytes were read
+    sfdp_bytes = sfdp.to_bytes(4, "little")[:bytes]
+    log.print(
+        f"Flash memory SFDP[{address}..{address + bytes - 1}]: "
+        + "".join(f"{b:#04x} " for b in sfdp_bytes)
+    )
 
 
 def read_flash(
@@ -1329,8 +1481,15 @@ def read_flash(
     if no_progress:
         flash_progress = None
     else:
+        last_percent = -1
 
         def flash_progress(progress, length, offset):
+            nonlocal last_percent
+            # Redraw only when the whole percentage changes, not for every block
+            percent = 100 * progress // length
+            if percent == last_percent:
+                return
+            last_percent = percent
             log.progress_bar(
                 cur_iter=progress,
                 total_iters=length,
@@ -1357,6 +1516,54 @@ def read_flash(
         return data
 
 
+def _diff_flash(
+    esp: ESPLoader, address: int, image: bytes, diff_limit: int | None = None
+) -> tuple[list[tuple[int, int, int]], bool]:
+    """
+    Compare the flash contents at the given address with an image byte by byte.
+
+    The image is compared in 64 KiB windows. Windows whose MD5 digest matches
+    the flash are skipped, only the differing ones are read back.
+
+    Args:
+        esp: Initiated esp object connected to a real device.
+        address: Flash address of the image.
+        image: The expected flash contents.
+        diff_limit: Stop after this many differences (``None`` for no limit).
+
+    Returns:
+        Offset in the image, flash byte and image byte of each difference,
+        and whether the comparison stopped early because of the limit.
+    """
+    differences: list[tuple[int, int, int]] = []
+    window_size = 0x10000
+    chunk_size = esp.FLASH_SECTOR_SIZE
+    for window_start in range(0, len(image), window_size):
+        window = image[window_start : window_start + window_size]
+        window_address = address + window_start
+        if (
+            esp.flash_md5sum(window_address, len(window))
+            == hashlib.md5(window).hexdigest()
+        ):
+            continue
+        flash = esp.read_flash(window_address, len(window))
+        # Compare sector-sized chunks first (memcmp in C),
+        # and only look for the differing bytes in the chunks that differ
+        for chunk_start in range(0, len(window), chunk_size):
+            chunk_end = min(chunk_start + chunk_size, len(window))
+            if flash[chunk_start:chunk_end] != window[chunk_start:chunk_end]:
+                differences.extend(
+                    (window_start + i, flash[i], window[i])
+                    for i in range(chunk_start, chunk_end)
+                    if flash[i] != window[i]
+                )
+            # Keep going until a difference beyond the limit is found,
+            # so exactly diff_limit differences are not reported as cut off
+            if diff_limit is not None and len(differences) > diff_limit:
+                return differences[:diff_limit], True
+    return differences, False
+
+
 def verify_flash(
     esp: ESPLoader,
     addr_data: list[tuple[int, ImageSource]],
@@ -1364,6 +1571,7 @@ def verify_flash(
     flash_mode: str = "keep",
     flash_size: str = "keep",
     diff: bool = False,
+    diff_limit: int | None = None,
 ) -> None:
     """
     Verify the contents of the SPI flash memory against the provided binary files
@@ -1378,47 +1586,55 @@ def verify_flash(
         flash_mode: Flash mode setting (``"keep"`` to retain current).
         flash_size: Flash size setting (``"keep"`` to retain current).
         diff: If True, perform a byte-by-byte comparison on failure.
+        diff_limit: Stop the comparison after this many differences
+            (``None`` to list all of them).
     """
+    if diff_limit is not None and diff_limit < 1:
+        raise FatalError("The difference limit must be at least 1.")
     flash_size = _set_flash_parameters(esp, flash_size)  # Set flash size parameters
     mismatch = False
 
-    for address, data in addr_data:
-        data, source = get_bytes(data)
-        image = pad_to(data, 4)
+    # The image is hashed on the host while the device is hashing the flash
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for address, data in addr_data:
+            data, source = get_bytes(data)
+            # Pad the same way write_flash() does before updating the flash settings,
+            # the bootloader image is validated with the padding included. This only
+            # copies the image if its length isn't already a multiple of 4.
+            image = pad_to(data, 4)
 
-        image = _update_image_flash_params(
-            esp, address, flash_freq, flash_mode, flash_size, image
-        )
+            image = _update_image_flash_params(
+                esp, address, flash_freq, flash_mode, flash_size, image
+            )
 
-        image_size = len(image)
-        source = "input bytes" if source is None else f"'{source}'"
-        log.print(
-            f"Verifying {image_size:#x} ({image_size}) bytes "
-            f"at {address:#010x} in flash against {source}..."
-        )
-        # Try digest first, only read if there are differences.
-        digest = esp.flash_md5sum(address, image_size)
-        expected_digest = hashlib.md5(image).hexdigest()
-        if digest == expected_digest:
-            log.print("Verification successful (digest matched).")
-            continue
-        else:
-            mismatch = True
-            if not diff:
-                log.print("Verification failed (digest mismatch).")
+            image_size = len(image)
+            source = "input bytes" if source is None else f"'{source}'"
+            log.print(
+                f"Verifying {image_size:#x} ({image_size}) bytes "
+                f"at {address:#010x} in flash against {source}..."
+            )
+            # Try digest first, only read if there are differences.
+            expected_md5 = executor.submit(hashlib.md5, image)
+            digest = esp.flash_md5sum(address, image_size)
+            expected_digest = expected_md5.result().hexdigest()
+            if digest == expected_digest:
+                log.print("Verification successful (digest matched).")
                 continue
-
-        flash = esp.read_flash(address, image_size)
-        assert flash != image
-        differences = [i for i in range(image_size) if flash[i] != image[i]]
-        log.print(
-            f"Verification failed: {len(differences)} differences, "
-            f"first at {address + differences[0]:#010x}:"
-        )
-        for d in differences:
-            flash_byte = flash[d]
-            image_byte = image[d]
-            log.print(f"   {address + d:#010x} {flash_byte:02x} {image_byte:02x}")
+            else:
+                mismatch = True
+                if not diff:
+                    log.print("Verification failed (digest mismatch).")
+                    continue
+
+            differences, truncated = _diff_flash(esp, address, image, diff_limit)
+            assert differences
+            limit_msg = f" (limited to {diff_limit})" if truncated else ""
+            log.print(
+                f"Verification failed: {len(differences)} differences{limit_msg}, "
+                f"first at {address + differences[0][0]:#010x}:"
+            )
+            for d, flash_byte, image_byte in differences:
+                log.print(f"   {address + d:#010x} {flash_byte:02x} {image_byte:02x}")
     if mismatch:
         raise FatalError("Verification failed.")
 
@@ -1462,34 +1678,11 @@ def get_security_info(esp: ESPLoader) -> None:
     Args:
         esp: Initiated esp object connected to a real device.
     """
-    # The following mapping was taken from the ROM code
-    # This mapping is same across all targets in the ROM
-    SECURITY_INFO_FLAG_MAP = {
-        "SECURE_BOOT_EN": (1 << 0),
-        "SECURE_BOOT_AGGRESSIVE_REVOKE": (1 << 1),
-        "SECURE_DOWNLOAD_ENABLE": (1 << 2),
-        "SECURE_BOOT_KEY_REVOKE0": (1 << 3),
-        "SECURE_BOOT_KEY_REVOKE1": (1 << 4),
-        "SECURE_BOOT_KEY_REVOKE2": (1 << 5),
-        "SOFT_DIS_JTAG": (1 << 6),
-        "HARD_DIS_JTAG": (1 << 7),
-        "DIS_USB": (1 << 8),
-        "DIS_DOWNLOAD_DCACHE": (1 << 9),
-        "DIS_DOWNLOAD_ICACHE": (1 << 10),
-    }
-
-    # Get the status of respective security flag
-    def get_security_flag_status(flag_name, flags_value):
-        try:
-            return (flags_value & SECURITY_INFO_FLAG_MAP[flag_name]) != 0
-        except KeyError:
-            raise ValueError(f"Invalid flag name: {flag_name}")
-
     si = esp.get_security_info()
     title = "Security Information:"
     log.print(title)
     log.print("=" * len(title))
-    log.print("Flags: {:#010x} ({})".format(si["flags"], bin(si["flags"])))
+    log.print(f"Flags: {si['flags']:#010x} ({si['flags']:#b})")
     if esp.KEY_PURPOSES:
         log.print(f"Key Purposes: {si['key_purposes']}")
         desc = "\n  ".join(
@@ -1504,23 +1697,17 @@ def get_security_info(esp: ESPLoader) -> None:
         log.print("Chip ID: {}".format(si["chip_id"]))
         log.print("API Version: {}".format(si["api_version"]))
 
-    flags = si["flags"]
+    # Decode all the security flags at once
+    flags = {
+        name: (si["flags"] & mask) != 0 for name, mask in SECURITY_INFO_FLAG_MAP.items()
+    }
 
-    if get_security_flag_status("SECURE_BOOT_EN", flags):
+    if flags["SECURE_BOOT_EN"]:
         log.print("Secure Boot: Enabled")
-        if get_security_flag_status("SECURE_BOOT_AGGRESSIVE_REVOKE", flags):
+        if flags["SECURE_BOOT_AGGRESSIVE_REVOKE"]:
             log.print("Secure Boot Aggressive key revocation: Enabled")
 
-        revoked_keys = []
-        for i, key in enumerate(
-            [
-                "SECURE_BOOT_KEY_REVOKE0",
-                "SECURE_BOOT_KEY_REVOKE1",
-                "SECURE_BOOT_KEY_REVOKE2",
-            ]
-        ):
-            if get_security_flag_status(key, flags):
-                revoked_keys.append(i)
+        revoked_keys = [i for i in range(3) if flags[f"SECURE_BOOT_KEY_REVOKE{i}"]]
 
         if len(revoked_keys) > 0:
             log.print("Secure Boot Key Revocation Status:\n")
@@ -1530,8 +1717,8 @@ def get_security_info(esp: ESPLoader) -> None:
     else:
         log.print("Secure Boot: Disabled")
 
-    flash_crypt_cnt = bin(si["flash_crypt_cnt"])
-    if (flash_crypt_cnt.count("1") % 2) != 0:
+    # Flash encryption is enabled with an odd number of bits set in the counter
+    if si["flash_crypt_cnt"].bit_count() & 1 != 0:
         log.print("Flash Encryption: Enabled")
     else:
         log.print("Flash Encryption: Disabled")
@@ -1542,19 +1729,19 @@ def get_security_info(esp: ESPLoader) -> None:
 
     log.print(f"{CRYPT_CNT_STRING}: {si['flash_crypt_cnt']:#x}")
 
-    if get_security_flag_status("DIS_DOWNLOAD_DCACHE", flags):
+    if flags["DIS_DOWNLOAD_DCACHE"]:
         log.print("Dcache in UART download mode: Disabled")
 
-    if get_security_flag_status("DIS_DOWNLOAD_ICACHE", flags):
+    if flags["DIS_DOWNLOAD_ICACHE"]:
         log.print("Icache in UART download mode: Disabled")
 
-    hard_dis_jtag = get_security_flag_status("HARD_DIS_JTAG", flags)
-    soft_dis_jtag = get_security_flag_status("SOFT_DIS_JTAG", flags)
+    hard_dis_jtag = flags["HARD_DIS_JTAG"]
+    soft_dis_jtag = flags["SOFT_DIS_JTAG"]
     if hard_dis_jtag:
         log.print("JTAG: Permanently Disabled")
     elif soft_dis_jtag:
         log.print("JTAG: Software Access Disabled")
-    if get_security_flag_status("DIS_USB", flags):
+    if flags["DIS_USB"]:
         log.print("USB Access: Disabled")
 
 
@@ -2082,6 +2269,9 @@ def merge_bin(
             return None
 
     elif output is not None and format == "hex":
+        # Imported here, only the HEX output format needs intelhex
+        from intelhex import IntelHex
+
         out = IntelHex()
         if len(addr_data) == 1:
             log.warning(
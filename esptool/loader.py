@@ -1356,8 +1356,9 @@ class ESPLoader(object):
             self.ESP_CMDS["READ_FLASH"],
             struct.pack("<IIII", offset, length, self.FLASH_SECTOR_SIZE, 64),
         )
-        # now we expect (length // block_size) SLIP frames with the data
-        data = b""
+        # now we expect (length // block_size) SLIP frames with the data,
+        # collect them in place instead of re-copying the whole buffer per frame
+        data = bytearray()
         while len(data) < length:
             self._port.timeout = 3
             p = self.read()
@@ -1383,7 +1384,7 @@ class ESPLoader(object):
             raise FatalError(
                 f"Digest mismatch: expected {expected_digest}, got {digest}"
             )
-        return data
+        return bytes(data)
 
     def flash_spi_attach(self, hspi_arg):
         """Send SPI attach command to enable the SPI flash pins
@@ -72,6 +72,8 @@ class EsptoolLogger(TemplateLogger):
     _kept_lines: list[str] = []
 
     _smart_features: bool = False
+    _last_progress_step: int = -1
+    _last_progress_iter: int = -1
 
     def __new__(cls):
         """
@@ -217,9 +219,24 @@ class EsptoolLogger(TemplateLogger):
     ):
         """
         Call in a loop to print a progress bar overwriting itself in place.
-        If terminal doesn't support ANSI escape codes, no overwriting happens.
+        If terminal doesn't support ANSI escape codes, no overwriting happens
+        and the progress is only printed in steps of 5 %.
         """
 
+        if not self._smart_features:
+            # Every update is printed on a new line, don't flood the log with them
+            step = 20 * cur_iter // total_iters
+            # Starting over means a new bar, e.g. a retry after an interrupted one
+            new_bar = cur_iter == 0 or cur_iter < self._last_progress_iter
+            self._last_progress_iter = -1 if cur_iter == total_iters else cur_iter
+            if (
+                not new_bar
+                and cur_iter != total_iters
+                and step == self._last_progress_step
+            ):
+                return
+            self._last_progress_step = -1 if cur_iter == total_iters else step
+
         filled = int(bar_length * cur_iter // total_iters)
         if filled == bar_length:
             bar = "=" * bar_length
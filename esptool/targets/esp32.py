@@ -183,7 +183,7 @@ class ESP32ROM(ESPLoader):
             & self.EFUSE_SPI_BOOT_CRYPT_CNT_MASK
         )
         # Flash encryption enabled when odd number of bits are set
-        return bin(flash_crypt_cnt).count("1") & 1 != 0
+        return flash_crypt_cnt.bit_count() & 1 != 0
 
     def get_secure_boot_enabled(self):
         efuses = self.read_reg(self.EFUSE_RD_ABS_DONE_REG)
@@ -385,7 +385,7 @@ class ESP32ROM(ESPLoader):
     def read_flash_slow(self, offset, length, progress_fn):
         BLOCK_LEN = 64  # ROM read limit per command (this limit is why it's so slow)
 
-        data = b""
+        data = bytearray()
         while len(data) < length:
             block_len = min(BLOCK_LEN, length - len(data))
             try:
@@ -407,7 +407,7 @@ class ESP32ROM(ESPLoader):
             data += r[:block_len]
             if progress_fn and (len(data) % 1024 == 0 or len(data) == length):
                 progress_fn(len(data), length, offset)
-        return data
+        return bytes(data)
 
     def get_rom_cal_crystal_freq(self):
         """
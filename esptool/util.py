@@ -49,12 +49,15 @@ def flash_size_bytes(size):
 
 
 def hexify(s, uppercase=True):
-    format_str = "%02X" if uppercase else "%02x"
-    return "".join(format_str % c for c in s)
+    hex_str = bytes(s).hex()
+    return hex_str.upper() if uppercase else hex_str
 
 
 def pad_to(data, alignment, pad_character=b"\xff"):
-    """Pad to the next alignment boundary"""
+    """Pad to the next alignment boundary
+
+    Already aligned data is returned as is. A bytearray is padded in place,
+    bytes are copied into a new, padded object."""
     pad_mod = len(data) % alignment
     if pad_mod != 0:
         data += pad_character * (alignment - pad_mod)
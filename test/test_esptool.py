@@ -20,6 +20,7 @@
 # options. The --preload-port needs to be connected to a USB-to-UART bridge,
 # while --port needs to be connected to the USB-Serial/JTAG peripheral.
 
+import hashlib
 import os
 import os.path
 import random
@@ -28,6 +29,7 @@ import struct
 import subprocess
 import sys
 import tempfile
+import zlib
 from io import StringIO
 from socket import AF_INET, SOCK_STREAM, socket
 from time import sleep
@@ -51,6 +53,7 @@ try:
     import esptool
     import espefuse
     from esptool.cmds import (
+        _compress_image,
         detect_chip,
         erase_flash,
         attach_flash,
@@ -432,6 +435,22 @@ class TestFlashEncryption(EsptoolTestCase):
             os.remove("images/read_encrypted_flash.bin")
             os.remove("images/local_enc.bin")
 
+    def test_encrypt_files_alignment(self):
+        """
+        encrypted write alignment is checked for the files to encrypt,
+        not for the files written in plaintext
+        """
+        output = self.run_esptool_error(
+            "write-flash 0x8004 images/one_kb.bin "
+            "--encrypt-files 0x10010 images/ram_helloworld/helloworld-esp32.bin"
+        )
+        assert (
+            "'images/ram_helloworld/helloworld-esp32.bin' (address 0x10010) "
+            "is not 32 byte aligned" in output
+        )
+        assert "'images/one_kb.bin' (address 0x8004)" not in output
+        assert "Can't perform encrypted flash write" in output
+
 
 class TestFlashing(EsptoolTestCase):
     @pytest.mark.quick_test
@@ -625,6 +644,23 @@ class TestFlashing(EsptoolTestCase):
         )
         assert "Detected overlap at address: 0x1d00" in output
 
+    @pytest.mark.host_test
+    def test_compress_image(self):
+        with open("images/ram_helloworld/helloworld-esp32.bin", "rb") as f:
+            image = f.read() + bytes(random.getrandbits(8) for _ in range(0x2345))
+        md5 = hashlib.md5()
+        compressed, comp_offsets, uncomp_offsets = _compress_image(image, 0x1000, md5)
+        assert zlib.decompress(compressed) == image
+        assert md5.hexdigest() == hashlib.md5(image).hexdigest()
+        assert comp_offsets == sorted(comp_offsets)
+        assert uncomp_offsets == sorted(uncomp_offsets)
+        assert comp_offsets[-1] == len(compressed)
+        assert uncomp_offsets[-1] == len(image)
+        # Data up to a flush point decompresses to the data up to its offset
+        for comp_offset, uncomp_offset in zip(comp_offsets, uncomp_offsets):
+            decompressed = zlib.decompressobj().decompress(compressed[:comp_offset])
+            assert decompressed == image[:uncomp_offset]
+
     def test_write_no_overlap(self):
         output = self.run_esptool(
             "write-flash 0x0 images/one_kb.bin 0x2000 images/one_kb.bin"
@@ -1162,6 +1198,13 @@ class TestVerifyCommand(EsptoolTestCase):
         assert "Verification failed:" in output
         assert "first at 0x00006000:" in output
 
+    def test_verify_failure_diff_limit(self):
+        self.run_esptool("write-flash 0x6000 images/sector.bin")
+        output = self.run_esptool_error(
+            "verify-flash --diff --diff-limit 10 0x6000 images/one_kb.bin"
+        )
+        assert "Verification failed: 10 differences (limited to 10)" in output
+
     def test_verify_unaligned_length(self):
         self.run_esptool("write-flash 0x0 images/not_4_byte_aligned.bin")
         self.run_esptool("verify-flash 0x0 images/not_4_byte_aligned.bin")
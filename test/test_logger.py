@@ -128,6 +128,26 @@ class TestLogger:
             assert "Progress: [====>     ]  50.0% (2/4)" in output
             assert "Progress: [==========] 100.0% (4/4) \n" in output
 
+    def test_progress_bar_no_smart_features(self, logger):
+        logger._set_smart_features(False)
+        with patch("sys.stdout", new=StringIO()) as fake_out:
+            for i in range(101):
+                logger.progress_bar(cur_iter=i, total_iters=100, prefix="Progress: ")
+            output = fake_out.getvalue()
+            # Only every 5 % is printed, including the start and the end
+            assert output.count("Progress: ") == 21
+            assert "  5.0%" in output
+            assert "  6.0%" not in output
+            assert "100.0%" in output
+
+        with patch("sys.stdout", new=StringIO()) as fake_out:
+            # A bar interrupted before reaching 100 % and started again
+            logger.progress_bar(cur_iter=0, total_iters=100, prefix="Progress: ")
+            logger.progress_bar(cur_iter=2, total_iters=100, prefix="Progress: ")
+            logger.progress_bar(cur_iter=0, total_iters=100, prefix="Progress: ")
+            output = fake_out.getvalue()
+            assert output.count("Progress: ") == 2
+
     def test_set_incomplete_logger(self, logger):
         with pytest.raises(
             TypeError,